@@ -0,0 +1,667 @@
+"""gitlab_scanner.py / gitleaks_reports_to_csv.py 的基准测试
+
+在本机启动一个模拟 GitLab API（可配置延迟与限流）、生成指定大小的合成仓库和一个模拟 gitleaks，
+依次运行 导出 → 扫描 → 汇总 三个阶段，记录吞吐量（项目/小时）、每个项目的 API 调用次数、
+峰值磁盘占用与峰值内存，结果保存为 JSON，便于在版本之间对比。
+
+仅支持 Linux/macOS（依赖 os.wait4 与可执行的 Python 脚本作为 gitleaks）。
+
+    python benchmark.py --projects 200 --latency-ms 20 --rate-limit 50 --output bench_results/base.json
+    python benchmark.py --projects 200 --latency-ms 20 --rate-limit 50 --compare bench_results/base.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import signal
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CUTOFF_DATE = "2025-07-01"
+DISK_SAMPLE_SECONDS = 0.5
+DAEMON_WAIT_SECONDS = 300
+
+# 模拟 gitleaks：在 --report-path 写入 BENCH_FINDINGS 条发现，模拟扫描耗时 BENCH_SCAN_MS；
+# --pipe（--scan-input stdin）时读完标准输入，与真实的 gitleaks 一样不让 git log 因管道关闭而失败
+FAKE_GITLEAKS = r'''#!{python}
+import json, os, random, sys, time
+args = sys.argv[1:]
+report = args[args.index("--report-path") + 1]
+if "--pipe" in args:
+    source = "stdin"
+    while sys.stdin.buffer.read(1 << 16):
+        pass
+else:
+    source = args[args.index("--source") + 1]
+time.sleep(int(os.environ.get("BENCH_SCAN_MS", "0")) / 1000)
+findings = int(os.environ.get("BENCH_FINDINGS", "0"))
+with open(report, "w") as f:
+    json.dump([
+        {{
+            "RuleID": "generic-api-key",
+            "File": "src/config_%d.py" % i,
+            "StartLine": i,
+            "Secret": "sk_%032x" % random.getrandbits(128),
+            "Match": "api_key = sk_...",
+            "Commit": "%040x" % random.getrandbits(160),
+            "Author": "bench",
+            "Email": "bench@example.com",
+            "Date": "2025-08-01T00:00:00Z",
+            "Fingerprint": "%s:%d" % (os.path.basename(source), i),
+        }}
+        for i in range(findings)
+    ], f)
+'''
+
+
+class StubGitLab:
+    """模拟 GitLab API：项目列表（keyset/offset 分页、statistics）、单个项目与最近提交查询
+
+    每个请求先等待 latency 秒；rate_limit > 0 时按每秒请求数限流，超出返回 429 + Retry-After，
+    并像 GitLab 一样在每个响应中带 RateLimit-* 头。
+    """
+
+    def __init__(self, projects, latency, rate_limit):
+        self.projects = projects
+        self.by_id = {p["id"]: p for p in projects}
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.window = 0
+        self.window_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def _admit(self):
+        """返回 (是否放行, 本窗口剩余次数, 窗口重置时间)"""
+        now = time.time()
+        with self.lock:
+            self.calls += 1
+            window = int(now)
+            if window != self.window:
+                self.window = window
+                self.window_count = 0
+            self.window_count += 1
+            if self.rate_limit and self.window_count > self.rate_limit:
+                self.throttled += 1
+                return False, 0, window + 1
+            remaining = max(0, self.rate_limit - self.window_count) if self.rate_limit else 1000
+            return True, remaining, window + 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, body, remaining, reset, extra_headers=()):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if stub.rate_limit:
+                    self.send_header("RateLimit-Limit", str(stub.rate_limit))
+                    self.send_header("RateLimit-Remaining", str(remaining))
+                    self.send_header("RateLimit-Reset", str(reset))
+                for name, value in extra_headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                admitted, remaining, reset = stub._admit()
+                time.sleep(stub.latency)
+                if not admitted:
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                parts = url.path.strip("/").split("/")
+                if url.path == "/api/v4/projects":
+                    self.list_projects(query, remaining, reset)
+                elif len(parts) == 4 and parts[3].isdigit():
+                    project = stub.by_id.get(int(parts[3]))
+                    if project is None:
+                        self.send_error(404)
+                    else:
+                        self.send_json(self.public(project), remaining, reset)
+                elif len(parts) == 6 and parts[4:] == ["repository", "commits"]:
+                    project = stub.by_id.get(int(parts[3]))
+                    body = [{"id": "0" * 40, "committed_date": project["last_commit_time"]}] if project else []
+                    self.send_json(body, remaining, reset)
+                else:
+                    self.send_error(404)
+
+            def list_projects(self, query, remaining, reset):
+                per_page = min(100, int(query.get("per_page", 20)))
+                projects = stub.projects
+                after = query.get("last_activity_after")
+                if after:
+                    projects = [p for p in projects if p["last_activity_at"] > after]
+                if query.get("pagination") == "keyset":
+                    id_after = int(query.get("id_after", 0))
+                    page = [p for p in projects if p["id"] > id_after][:per_page]
+                    more = bool(page) and page[-1]["id"] < projects[-1]["id"]
+                    next_query = dict(query, id_after=page[-1]["id"]) if more else None
+                else:
+                    start = (max(1, int(query.get("page", 1))) - 1) * per_page
+                    page = projects[start:start + per_page]
+                    next_query = None
+                headers = []
+                if next_query:
+                    headers.append(("Link", f'<{stub.url}/api/v4/projects?{urlencode(next_query)}>; rel="next"'))
+                self.send_json([self.public(p) for p in page], remaining, reset, headers)
+
+            @staticmethod
+            def public(project):
+                return {k: v for k, v in project.items() if k != "last_commit_time"}
+
+        return Handler
+
+    def touch(self, project_id, when):
+        """模拟项目有新活动：更新 last_activity_at，供常驻模式的轮询发现"""
+        self.by_id[project_id]["last_activity_at"] = when.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def close(self):
+        self.server.shutdown()
+
+
+def push_hook_payload(project, before, after):
+    """GitLab 系统钩子 push 事件中常驻模式用到的字段"""
+    return {
+        "object_kind": "push",
+        "event_name": "push",
+        "before": before,
+        "after": after,
+        "ref": "refs/heads/" + project["default_branch"],
+        "project_id": project["id"],
+        "project": {
+            "id": project["id"],
+            "name": project["name"],
+            "path_with_namespace": project["path_with_namespace"],
+            "web_url": project["web_url"],
+            "default_branch": project["default_branch"],
+            "git_http_url": project["http_url_to_repo"],
+        },
+    }
+
+
+def post_push_hook(url, secret, payload):
+    """向 --hook-listen 发送一次推送事件，返回 HTTP 状态码"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", "X-Gitlab-Event": "System Hook", "X-Gitlab-Token": secret},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_synthetic_repo(path, commits, file_kb):
+    """用 git fast-import 生成仓库：commits 个提交，每个提交新增一个 file_kb KB 的不可压缩文件
+
+    前一半提交按天分布在 CUTOFF_DATE 之前，后一半分布在截止时间后的一天内，最后一个提交
+    不晚于任何匹配项目的 last_commit_time（截止时间后 1 至 180 天），与桩 API 的说法一致，
+    --clone-mode shallow-since 也能拉到截止时间之后的那一半。
+    """
+    subprocess.run(["git", "init", "-q", "--bare", path], check=True)
+    cutoff = int(datetime.strptime(CUTOFF_DATE, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp())
+    half = commits // 2
+    stream = []
+    for i in range(commits):
+        if i < half:
+            committed_at = cutoff - (half - i) * 86400
+        else:
+            committed_at = cutoff + (i - half + 1) * 86400 // (commits - half)
+        blob = os.urandom(file_kb * 512).hex().encode("ascii")
+        stream.append(b"blob\nmark :%d\ndata %d\n%s\n" % (i + 1, len(blob), blob))
+        message = b"commit %d" % i
+        stream.append(
+            b"commit refs/heads/main\n"
+            b"committer bench <bench@example.com> %d +0000\n"
+            b"data %d\n%s\n"
+            b"M 100644 :%d file_%d.txt\n"
+            % (committed_at, len(message), message, i + 1, i)
+        )
+    subprocess.run(["git", "-C", path, "fast-import", "--quiet"], input=b"".join(stream), check=True)
+    subprocess.run(["git", "-C", path, "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+
+
+def build_projects(count, repo_urls, match_ratio, seed):
+    """count 个合成项目，按 match_ratio 的比例最近提交晚于 CUTOFF_DATE；仓库地址轮流使用 repo_urls"""
+    rng = random.Random(seed)
+    cutoff = datetime.strptime(CUTOFF_DATE, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    projects = []
+    for i in range(1, count + 1):
+        offset_days = rng.randint(1, 180)
+        last_commit = cutoff + timedelta(days=offset_days) if rng.random() < match_ratio else cutoff - timedelta(days=offset_days)
+        iso = last_commit.strftime("%Y-%m-%dT%H:%M:%SZ")
+        projects.append({
+            "id": i,
+            "name": f"bench{i}",
+            "path_with_namespace": f"bench/bench{i}",
+            "web_url": f"http://gitlab.invalid/bench/bench{i}",
+            "default_branch": "main",
+            "http_url_to_repo": repo_urls[i % len(repo_urls)],
+            "last_activity_at": iso,
+            "last_commit_time": iso,
+            "statistics": {"repository_size": 0},
+        })
+    return projects
+
+
+def get_dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class DiskSampler:
+    """后台定期统计若干目录的总大小，记录峰值"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            self.peak = max(self.peak, sum(get_dir_size(p) for p in self.paths))
+            if self.stop_event.wait(DISK_SAMPLE_SECONDS):
+                return
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        return self.peak
+
+
+def run_phase(name, cmd, env, log_dir, disk_paths):
+    """运行一个阶段（子进程），返回耗时、退出码、峰值内存与峰值磁盘占用"""
+    log_path = os.path.join(log_dir, f"{name}.log")
+    sampler = DiskSampler(disk_paths)
+    started = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=ROOT)
+        _, status, rusage = os.wait4(process.pid, 0)
+    seconds = time.monotonic() - started
+    peak_disk = sampler.stop()
+    # ru_maxrss 是子进程及其已回收的后代中最大的单个进程 RSS（Linux 为 KB，macOS 为字节）
+    peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    exit_code = os.waitstatus_to_exitcode(status)
+    print(f"  - {name}: {seconds:.1f}s, 退出码 {exit_code}, 峰值内存 {peak_rss_kb / 1024:.0f} MB, 峰值磁盘 {peak_disk / 1024 ** 2:.1f} MB")
+    if exit_code != 0:
+        print(f"    [!] 阶段失败，日志: {log_path}")
+        with open(log_path, "r", encoding="utf-8", errors="replace") as log:
+            for line in log.readlines()[-20:]:
+                print(f"    | {line.rstrip()}")
+    return {
+        "seconds": round(seconds, 3),
+        "exit_code": exit_code,
+        "peak_rss_kb": peak_rss_kb,
+        "peak_disk_bytes": peak_disk,
+    }
+
+
+def run_daemon_phase(args, scanner, env, log_dir, report_dir, stub, projects):
+    """常驻模式：启动 --daemon 后由桩向 --hook-listen 发送推送事件，并让一个项目出现新活动供轮询发现
+
+    等到这些项目都写入扫描指标后发送 Ctrl+C（SIGINT）退出，记录事件发出到扫描完成的延迟。
+    推送事件的 before 为默认分支往前 5 个提交，走增量扫描；轮询发现的项目没有 before，完整扫描一次。
+    """
+    port = free_port()
+    secret = "bench-hook-secret"
+    hook_url = f"http://127.0.0.1:{port}/"
+    metrics_file = os.path.join(report_dir, "scan_metrics.jsonl")
+    metrics_before = count_lines(metrics_file)
+    matched = [p for p in projects if p["last_commit_time"] > CUTOFF_DATE]
+    hooked = matched[:args.daemon_events]
+    polled = matched[args.daemon_events] if len(matched) > args.daemon_events else None
+
+    shas = {}
+    for project in hooked:
+        repo = project["http_url_to_repo"][len("file://"):]
+        if repo not in shas:
+            rev_parse = ["git", "-C", repo, "rev-parse", "main~5", "main"]
+            shas[repo] = subprocess.run(rev_parse, stdout=subprocess.PIPE, check=True, text=True).stdout.split()
+
+    cmd = scanner + [
+        "--daemon", "--hook-listen", f"127.0.0.1:{port}", "--hook-secret", secret,
+        "--poll-seconds", "2", "--debounce-seconds", "1", "--workers", "2",
+    ]
+    log_path = os.path.join(log_dir, "daemon.log")
+    sent = {}
+    accepted = 0
+    rejected_bad_secret = False
+    started = time.monotonic()
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT, env=env, cwd=ROOT)
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    # 错误的密钥应返回 401，同时用来等待钩子端口就绪
+                    rejected_bad_secret = post_push_hook(hook_url, "wrong-secret", {}) == 401
+                    break
+                except OSError:
+                    if time.monotonic() > deadline or process.poll() is not None:
+                        raise RuntimeError(f"常驻模式未能启动，日志: {log_path}")
+                    time.sleep(0.2)
+
+            for project in hooked:
+                before, after = shas[project["http_url_to_repo"][len("file://"):]]
+                sent[project["id"]] = time.time()
+                accepted += post_push_hook(hook_url, secret, push_hook_payload(project, before, after)) == 200
+            if polled is not None:
+                sent[polled["id"]] = time.time()
+                stub.touch(polled["id"], datetime.now(timezone.utc) + timedelta(seconds=2))
+
+            deadline = time.monotonic() + DAEMON_WAIT_SECONDS
+            while time.monotonic() < deadline and process.poll() is None:
+                if {r.get("project_id") for r in read_metrics(metrics_file, metrics_before)} >= set(sent):
+                    break
+                time.sleep(0.5)
+        finally:
+            if process.poll() is None:
+                process.send_signal(signal.SIGINT)
+            _, wait_status, rusage = os.wait4(process.pid, 0)
+    seconds = time.monotonic() - started
+
+    latencies = {}
+    for record in read_metrics(metrics_file, metrics_before):
+        project_id = record.get("project_id")
+        if project_id in sent and project_id not in latencies:
+            latencies[project_id] = datetime.fromisoformat(record["finished_at"]).timestamp() - sent[project_id]
+    statuses = read_metrics_statuses(metrics_file, metrics_before)
+    missing = len(set(sent) - set(latencies))
+    failed = sum(n for status, n in statuses.items() if status in FAILED_STATUSES) + missing
+    ordered = sorted(latencies.values())
+    exit_code = os.waitstatus_to_exitcode(wait_status)
+    peak_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == "darwin" else rusage.ru_maxrss
+    result = {
+        "seconds": round(seconds, 3),
+        "exit_code": exit_code,
+        "peak_rss_kb": peak_rss_kb,
+        "hook_events": len(hooked),
+        "hook_events_accepted": accepted,
+        "hook_rejects_bad_secret": rejected_bad_secret,
+        "polled_projects": int(polled is not None),
+        "statuses": statuses,
+        "failed_projects": failed,
+        "event_latency_p50_seconds": round(ordered[len(ordered) // 2], 3) if ordered else None,
+        "event_latency_max_seconds": round(ordered[-1], 3) if ordered else None,
+    }
+    print(
+        f"  - daemon: {seconds:.1f}s, 退出码 {exit_code}, 事件 {len(sent)}（推送 {accepted}/{len(hooked)}，轮询 {int(polled is not None)}），"
+        f"已扫描 {len(latencies)}，延迟 p50 {result['event_latency_p50_seconds']}s / 最大 {result['event_latency_max_seconds']}s"
+    )
+    if failed or not rejected_bad_secret:
+        print(f"    [!] {failed} 个事件未扫描或扫描失败（{statuses}），错误密钥{'已' if rejected_bad_secret else '未'}被拒绝，日志: {log_path}")
+        result["failed_projects"] = failed or 1
+    return result
+
+
+def per_hour(count, seconds):
+    return round(count / seconds * 3600, 1) if seconds > 0 else None
+
+
+def read_metrics(path, skip_lines=0):
+    """scan_metrics.jsonl 中第 skip_lines 行之后（即本阶段写入）的记录"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in itertools.islice(f, skip_lines, None):
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def read_metrics_statuses(path, skip_lines=0):
+    statuses = {}
+    for record in read_metrics(path, skip_lines):
+        status = record.get("status", "")
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for _ in f)
+
+
+def count_csv_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        return max(0, sum(1 for _ in f) - 1)
+
+
+def git_version():
+    result = subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return result.stdout.decode().strip() or "unknown"
+
+
+def run_benchmark(args, root):
+    repos_dir = os.path.join(root, "repos")
+    report_dir = os.path.join(root, "reports")
+    work_dir = os.path.join(root, "work")
+    log_dir = os.path.join(root, "logs")
+    for path in (repos_dir, report_dir, work_dir, log_dir):
+        os.makedirs(path, exist_ok=True)
+
+    print(f"[*] 生成 {args.repos} 个合成仓库（{args.commits} 个提交 x {args.file_kb} KB）...")
+    repo_urls = []
+    for i in range(args.repos):
+        path = os.path.join(repos_dir, f"repo{i}.git")
+        create_synthetic_repo(path, args.commits, args.file_kb)
+        # file:// 走真实的打包传输，而不是本地硬链接
+        repo_urls.append("file://" + path)
+    repo_size = get_dir_size(os.path.join(repos_dir, "repo0.git"))
+
+    projects = build_projects(args.projects, repo_urls, args.match_ratio, args.seed)
+    for project in projects:
+        project["statistics"]["repository_size"] = repo_size
+
+    gitleaks_path = os.path.join(root, "fake_gitleaks.py")
+    with open(gitleaks_path, "w", encoding="utf-8") as f:
+        f.write(FAKE_GITLEAKS.format(python=sys.executable))
+    os.chmod(gitleaks_path, os.stat(gitleaks_path).st_mode | stat.S_IEXEC)
+
+    stub = StubGitLab(projects, args.latency_ms / 1000, args.rate_limit)
+    env = dict(
+        os.environ,
+        GITLAB_URL=stub.url,
+        GITLAB_TOKEN="bench-token",
+        GITLEAKS_PATH=gitleaks_path,
+        WORK_DIR=work_dir,
+        REPORT_DIR=report_dir,
+        BENCH_FINDINGS=str(args.findings),
+        BENCH_SCAN_MS=str(args.scan_ms),
+        PYTHONUNBUFFERED="1",
+    )
+    scanner = [sys.executable, os.path.join(ROOT, "gitlab_scanner.py"), "--cutoff-date", CUTOFF_DATE]
+    results = {}
+
+    try:
+        print(f"[*] 导出: {args.projects} 个项目（延迟 {args.latency_ms} ms，限流 {args.rate_limit or '无'} 次/秒）")
+        calls_before = stub.calls
+        phase = run_phase("export", scanner + ["--export-filtered-all", *args.export_args.split()], env, log_dir, [report_dir])
+        api_calls = stub.calls - calls_before
+        phase.update({
+            "projects": args.projects,
+            "projects_per_hour": per_hour(args.projects, phase["seconds"]),
+            "api_calls": api_calls,
+            "api_calls_per_project": round(api_calls / args.projects, 3),
+            "throttled": stub.throttled,
+        })
+        results["export"] = phase
+
+        filtered_file = os.path.join(report_dir, f"filtered_projects_since_{CUTOFF_DATE.replace('-', '')}_all.csv")
+        matched = count_csv_rows(filtered_file)
+        print(f"[*] 扫描: {matched} 个项目")
+        metrics_file = os.path.join(report_dir, "scan_metrics.jsonl")
+        metrics_before = count_lines(metrics_file)
+        phase = run_phase(
+            "scan",
+            scanner + ["--scan-from-filtered", "--filtered-projects-file", filtered_file, "--no-prompt", *args.scan_args.split()],
+            env, log_dir, [work_dir, report_dir],
+        )
+        statuses = read_metrics_statuses(metrics_file, metrics_before)
+        failed = sum(n for status, n in statuses.items() if status in FAILED_STATUSES)
+        phase.update({
+            "projects": matched,
+            "projects_per_hour": per_hour(matched, phase["seconds"]),
+            "statuses": statuses,
+            "failed_projects": failed,
+        })
+        if failed:
+            # 失败的项目耗时很短，项目/小时会虚高，不能当作性能提升
+            print(f"    [!] {failed} 个项目扫描失败（{statuses}），本次结果不可用于对比，日志: {os.path.join(log_dir, 'scan.log')}")
+        results["scan"] = phase
+
+        reports = [name for name in os.listdir(report_dir) if name.endswith("_report.json")]
+        print(f"[*] 汇总: {len(reports)} 个报告")
+        output_csv = os.path.join(root, "findings.csv")
+        phase = run_phase(
+            "aggregate",
+            [sys.executable, os.path.join(ROOT, "gitleaks_reports_to_csv.py"), "--reports-dir", report_dir,
+             "--output", output_csv, *args.aggregate_args.split()],
+            env, log_dir, [report_dir, root],
+        )
+        phase.update({
+            "reports": len(reports),
+            "reports_per_hour": per_hour(len(reports), phase["seconds"]),
+            "rows": count_csv_rows(output_csv),
+        })
+        results["aggregate"] = phase
+
+        if args.daemon_events:
+            print(f"[*] 常驻模式: {args.daemon_events} 个推送事件 + 1 个轮询事件")
+            results["daemon"] = run_daemon_phase(args, scanner, env, log_dir, report_dir, stub, projects)
+    finally:
+        stub.close()
+
+    return {
+        "version": git_version(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "keep", "work_root")},
+        "repo_size_bytes": repo_size,
+        "results": results,
+    }
+
+
+FAILED_STATUSES = ("error", "timeout")
+COMPARE_METRICS = (
+    "seconds", "projects_per_hour", "reports_per_hour", "api_calls_per_project", "peak_rss_kb", "peak_disk_bytes",
+    "event_latency_p50_seconds", "event_latency_max_seconds",
+)
+
+
+def print_comparison(baseline, current):
+    print(f"\n=== 与基线 {baseline.get('version')} 对比 ===")
+    for name, run in (("基线", baseline), ("本次", current)):
+        failed = run.get("results", {}).get("scan", {}).get("failed_projects")
+        if failed:
+            print(f"  [!] {name}有 {failed} 个项目扫描失败，扫描阶段的对比结果无效")
+    for phase, result in current["results"].items():
+        base = baseline.get("results", {}).get(phase, {})
+        for metric in COMPARE_METRICS:
+            if metric in result and base.get(metric):
+                change = (result[metric] - base[metric]) / base[metric] * 100
+                print(f"  {phase:<10}{metric:<24}{base[metric]:>14}{result[metric]:>14}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export, scan and aggregation against a stub GitLab and a stub gitleaks.")
+    parser.add_argument("--projects", type=int, default=200, help="Number of synthetic projects served by the stub API.")
+    parser.add_argument("--match-ratio", type=float, default=0.5, help="Share of projects whose last commit is after the cutoff.")
+    parser.add_argument("--latency-ms", type=int, default=20, help="Latency added to every stub API response.")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Stub API requests per second before answering 429 (0 = unlimited).")
+    parser.add_argument("--repos", type=int, default=4, help="Number of distinct synthetic repositories (projects share them round-robin).")
+    parser.add_argument("--commits", type=int, default=50, help="Commits per synthetic repository.")
+    parser.add_argument("--file-kb", type=int, default=64, help="Size of the file added by each commit, in KB.")
+    parser.add_argument("--findings", type=int, default=20, help="Findings written by the stub gitleaks per report.")
+    parser.add_argument("--scan-ms", type=int, default=200, help="Simulated gitleaks runtime per repository.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--export-args", default="", help="Extra arguments for the export phase, e.g. \"--api-concurrency 16\".")
+    parser.add_argument("--scan-args", default="--pipeline", help="Extra arguments for the scan phase.")
+    parser.add_argument("--aggregate-args", default="--stream", help="Extra arguments for gitleaks_reports_to_csv.py.")
+    parser.add_argument("--daemon-events", type=int, default=0, help="Push hooks to post to a --daemon run after the other phases (0 = skip).")
+    parser.add_argument("--work-root", default="", help="Directory for repos, reports and clones (default: a temp dir).")
+    parser.add_argument("--keep", action="store_true", help="Keep the work root after the run.")
+    parser.add_argument("--output", default="", help="Result JSON path (default: bench_results/<timestamp>.json).")
+    parser.add_argument("--compare", default="", help="Baseline result JSON to compare against.")
+    args = parser.parse_args()
+
+    if not hasattr(os, "wait4"):
+        print("[!] 基准测试需要 Linux/macOS（os.wait4）")
+        return 1
+
+    root = args.work_root or tempfile.mkdtemp(prefix="gitleaks_bench_")
+    os.makedirs(root, exist_ok=True)
+    try:
+        result = run_benchmark(args, root)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    output = args.output or os.path.join(ROOT, "bench_results", datetime.now().strftime("%Y%m%d_%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"[+] 结果已保存: {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(json.load(f), result)
+    ok = all(r["exit_code"] == 0 and not r.get("failed_projects") for r in result["results"].values())
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
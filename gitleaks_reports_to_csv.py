@@ -1,108 +1,750 @@
-import argparse
-import csv
-import json
-import os
-from pathlib import Path
-
-
-def iter_leaks(payload):
-    if isinstance(payload, list):
-        for item in payload:
-            if isinstance(item, dict):
-                yield item
-        return
-
-    if isinstance(payload, dict):
-        for key in ("Leaks", "leaks", "findings", "Findings"):
-            value = payload.get(key)
-            if isinstance(value, list):
-                for item in value:
-                    if isinstance(item, dict):
-                        yield item
-                return
-
-
-def coerce_str(value):
-    if value is None:
-        return ""
-    if isinstance(value, str):
-        return value
-    return str(value)
-
-
-def extract_row(leak):
-    return {
-        "File": coerce_str(leak.get("File") or leak.get("file")),
-        "RuleID": coerce_str(leak.get("RuleID") or leak.get("rule_id") or leak.get("ruleID")),
-        "Author": coerce_str(leak.get("Author") or leak.get("author")),
-        "Date": coerce_str(leak.get("Date") or leak.get("date")),
-        "Message": coerce_str(leak.get("Message") or leak.get("message")),
-        "Entropy": coerce_str(leak.get("Entropy") if "Entropy" in leak else leak.get("entropy")),
-        "Match": coerce_str(leak.get("Match") or leak.get("match")),
-    }
-
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--reports-dir",
-        default=str(Path.cwd() / "reports"),
-        help="Directory containing gitleaks JSON reports.",
-    )
-    parser.add_argument(
-        "--output",
-        default=str(Path.cwd() / "reports" / "gitleaks_findings.csv"),
-        help="Output CSV path.",
-    )
-    parser.add_argument(
-        "--pattern",
-        default="*.json",
-        help="Glob pattern for report files inside reports-dir.",
-    )
-    args = parser.parse_args()
-
-    reports_dir = Path(args.reports_dir)
-    output_path = Path(args.output)
-
-    if not reports_dir.exists() or not reports_dir.is_dir():
-        raise SystemExit(f"reports dir not found: {reports_dir}")
-
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-
-    columns = ["File", "RuleID", "Author", "Date", "Message", "Entropy", "Match"]
-
-    total_files = 0
-    total_rows = 0
-
-    with output_path.open("w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=columns)
-        writer.writeheader()
-
-        for report_path in sorted(reports_dir.glob(args.pattern)):
-            if not report_path.is_file():
-                continue
-            if report_path.name.endswith(".schema.json"):
-                continue
-
-            total_files += 1
-
-            try:
-                raw = report_path.read_text(encoding="utf-8")
-                if not raw.strip():
-                    continue
-                payload = json.loads(raw)
-            except (OSError, json.JSONDecodeError):
-                continue
-
-            for leak in iter_leaks(payload):
-                writer.writerow(extract_row(leak))
-                total_rows += 1
-
-    print(f"[+] scanned json files: {total_files}")
-    print(f"[+] extracted rows: {total_rows}")
-    print(f"[+] output: {output_path}")
-
-
-if __name__ == "__main__":
-    main()
-
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+LEAK_KEYS = ("Leaks", "leaks", "findings", "Findings")
+STREAM_CHUNK_SIZE = 1 << 16
+NUMBER_CHARS = "0123456789.eE+-"
+# Bump when the part file row format changes so --incremental re-parses everything.
+MANIFEST_VERSION = 4
+# batch_<batch>_<project name>_<project id>[_delta_<head[:12]>]_report.json, as written by gitlab_scanner.py.
+# The name group is non-greedy so an all-digit head prefix is not taken for the project id.
+REPORT_NAME_RE = re.compile(r"^batch_(\d+)_(.*?)_(\d+)(?:_delta_[0-9a-f]{12})?_report\.json$")
+
+
+def iter_leaks(payload):
+    if isinstance(payload, list):
+        for item in payload:
+            if isinstance(item, dict):
+                yield item
+        return
+
+    if isinstance(payload, dict):
+        for key in LEAK_KEYS:
+            value = payload.get(key)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        yield item
+                return
+
+
+class JsonStreamReader:
+    """Incremental JSON reader over a text stream.
+
+    Only the container structure (brackets, commas, keys) is walked by hand;
+    each element is decoded with json's raw_decode, so memory is bounded by
+    the largest single element rather than the whole document.
+    """
+
+    def __init__(self, stream, chunk_size=STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size=None):
+        chunk = self.stream.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        read_size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill(read_size):
+                    raise
+                # grow reads so one huge element is not re-parsed once per chunk
+                read_size *= 2
+                continue
+            # a number followed only by number characters up to the end of the
+            # buffer may be truncated ("1" of "12", "0" of "0.5", "1" of "1e-3")
+            if (
+                not self.eof
+                and isinstance(value, (int, float))
+                and not isinstance(value, bool)
+                and not self.buf[end:].strip(NUMBER_CHARS)
+            ):
+                if self._fill(read_size):
+                    continue
+            self.pos = end
+            return value
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.decode_value()
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at offset {self.pos - 1}")
+
+
+def iter_leaks_stream(stream):
+    """Streaming counterpart of iter_leaks for a report file object.
+
+    A dict report uses the first of LEAK_KEYS, in document order, that holds
+    a list; everything else in the document is skipped element by element.
+    """
+    reader = JsonStreamReader(stream)
+    char = reader.peek()
+    if char == "[":
+        for item in reader.iter_array():
+            if isinstance(item, dict):
+                yield item
+        return
+
+    if char != "{":
+        if char:
+            reader.decode_value()
+        return
+
+    reader.expect("{")
+    while reader.peek() != "}":
+        key = reader.decode_value()
+        reader.expect(":")
+        if key in LEAK_KEYS and reader.peek() == "[":
+            for item in reader.iter_array():
+                if isinstance(item, dict):
+                    yield item
+            return
+        reader.decode_value()
+        if reader.peek() == ",":
+            reader.pos += 1
+
+
+def iter_report_leaks(report_path, stream=False):
+    """Yield findings from one report file; raises OSError/ValueError on bad input."""
+    if stream:
+        with report_path.open("r", encoding="utf-8") as f:
+            yield from iter_leaks_stream(f)
+        return
+
+    raw = report_path.read_text(encoding="utf-8")
+    if not raw.strip():
+        return
+    yield from iter_leaks(json.loads(raw))
+
+
+def coerce_str(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return str(value)
+
+
+def extract_row(leak):
+    return {
+        "File": coerce_str(leak.get("File") or leak.get("file")),
+        "RuleID": coerce_str(leak.get("RuleID") or leak.get("rule_id") or leak.get("ruleID")),
+        "Author": coerce_str(leak.get("Author") or leak.get("author")),
+        "Date": coerce_str(leak.get("Date") or leak.get("date")),
+        "Message": coerce_str(leak.get("Message") or leak.get("message")),
+        "Entropy": coerce_str(leak.get("Entropy") if "Entropy" in leak else leak.get("entropy")),
+        "Match": coerce_str(leak.get("Match") or leak.get("match")),
+    }
+
+
+def parse_report_name(report_path):
+    """Project id/name and batch from a gitlab_scanner.py report file name.
+
+    The project id, name and namespaced path come from the report's
+    .meta.json sidecar when present; the file name is only a fallback,
+    since project names may themselves contain "_<digits>".
+    """
+    info = {"project_id": "", "project_name": "", "project_path": "", "batch": ""}
+    match = REPORT_NAME_RE.match(report_path.name)
+    if match:
+        info["batch"] = match.group(1)
+        info["project_name"] = match.group(2)
+        info["project_id"] = match.group(3)
+        info["project_path"] = match.group(2)
+
+    meta_path = report_path.with_name(report_path.name[:-len(".json")] + ".meta.json")
+    try:
+        with meta_path.open("r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("project_id") not in (None, ""):
+            info["project_id"] = str(meta["project_id"])
+        if meta.get("name"):
+            info["project_name"] = meta["name"]
+        if meta.get("path_with_namespace"):
+            info["project_path"] = meta["path_with_namespace"]
+    except (OSError, ValueError, AttributeError):
+        pass
+    return info
+
+
+def extract_record(leak, report_key, report_info):
+    """extract_row plus the fields the CSV drops, for the SQLite store and dedup."""
+    record = extract_row(leak)
+    record.update({
+        "Line": coerce_str(leak.get("StartLine") if "StartLine" in leak else leak.get("Line")),
+        "Commit": coerce_str(leak.get("Commit") or leak.get("commit")),
+        "Fingerprint": coerce_str(leak.get("Fingerprint") or leak.get("fingerprint")),
+        "Email": coerce_str(leak.get("Email") or leak.get("email")),
+        "SecretHash": secret_hash(record["RuleID"], leak),
+        "report": report_key,
+    })
+    record.update(report_info)
+    return record
+
+
+def secret_hash(rule_id, leak):
+    """Hash of RuleID + Secret (or Match); the raw secret never leaves the report."""
+    secret = coerce_str(leak.get("Secret") or leak.get("secret") or leak.get("Match") or leak.get("match"))
+    if not secret:
+        return ""
+    return hashlib.sha256(f"{rule_id}\0{secret}".encode("utf-8")).hexdigest()
+
+
+def iter_report_records(report_path, report_key, stream=False):
+    report_info = parse_report_name(report_path)
+    for leak in iter_report_leaks(report_path, stream):
+        yield extract_record(leak, report_key, report_info)
+
+
+SQLITE_COLUMNS = [
+    # (column, record key)
+    ("report", "report"),
+    ("project_id", "project_id"),
+    ("project_name", "project_name"),
+    ("project_path", "project_path"),
+    ("batch", "batch"),
+    ("rule_id", "RuleID"),
+    ("file", "File"),
+    ("line", "Line"),
+    ("commit_sha", "Commit"),
+    ("fingerprint", "Fingerprint"),
+    ("author", "Author"),
+    ("email", "Email"),
+    ("date", "Date"),
+    ("message", "Message"),
+    ("entropy", "Entropy"),
+    ("match", "Match"),
+]
+
+SQLITE_INDEXES = {
+    "idx_findings_rule_date": "rule_id, date",
+    "idx_findings_project_path": "project_path, date",
+    "idx_findings_project_id": "project_id",
+    "idx_findings_author": "author",
+    "idx_findings_date": "date",
+    "idx_findings_report": "report",
+}
+
+
+class FindingsDb:
+    """Indexed SQLite store of findings for triage queries.
+
+    Inserts are buffered and committed in one transaction; indexes are
+    (re)created on close so bulk loads are not slowed down by them.
+    """
+
+    def __init__(self, path, reset=True, batch_size=5000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.created = reset or not self.path.exists()
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.batch_size = batch_size
+        self.buffer = []
+        if reset:
+            self.conn.execute("DROP TABLE IF EXISTS findings")
+        columns = ", ".join(f"{name} {self._column_type(name)}" for name, _ in SQLITE_COLUMNS)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS findings (id INTEGER PRIMARY KEY, {columns})")
+        self.insert_sql = "INSERT INTO findings ({}) VALUES ({})".format(
+            ", ".join(name for name, _ in SQLITE_COLUMNS),
+            ", ".join("?" for _ in SQLITE_COLUMNS),
+        )
+
+    @staticmethod
+    def _column_type(name):
+        if name in ("project_id", "batch", "line"):
+            return "INTEGER"
+        if name == "entropy":
+            return "REAL"
+        return "TEXT"
+
+    @staticmethod
+    def _value(name, value):
+        if value == "":
+            return None
+        if name in ("project_id", "batch", "line"):
+            try:
+                return int(value)
+            except ValueError:
+                return None
+        if name == "entropy":
+            try:
+                return float(value)
+            except ValueError:
+                return None
+        return value
+
+    def add(self, record):
+        self.buffer.append(tuple(self._value(name, record.get(key, "")) for name, key in SQLITE_COLUMNS))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.conn.executemany(self.insert_sql, self.buffer)
+            self.buffer = []
+
+    def delete_report(self, report_key):
+        self.flush()
+        self.conn.execute("DELETE FROM findings WHERE report = ?", (report_key,))
+
+    def close(self):
+        self.flush()
+        for name, columns in SQLITE_INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON findings ({columns})")
+        self.conn.commit()
+        self.conn.execute("ANALYZE")
+        self.conn.close()
+
+
+DEDUP_COLUMNS = [
+    "SecretKey", "RuleID", "Occurrences", "Projects", "FirstSeen", "LastSeen",
+    "ProjectPath", "File", "Commit", "Author", "Match",
+]
+
+
+class DedupIndex:
+    """Groups findings into one row per unique secret.
+
+    The key is the hash of RuleID + Secret/Match, so the same secret found in
+    many commits, branches or forks collapses into one row; findings without a
+    secret fall back to the gitleaks Fingerprint. The index lives in a
+    temporary on-disk SQLite file, so memory stays bounded by SQLite's page
+    cache no matter how many findings there are. Example columns come from the
+    first occurrence in report order.
+    """
+
+    def __init__(self, work_dir, batch_size=5000):
+        fd, self.path = tempfile.mkstemp(prefix=".gitleaks_dedup_", suffix=".sqlite", dir=work_dir)
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute(
+            "CREATE TABLE secrets (key TEXT PRIMARY KEY, rule_id TEXT, occurrences INTEGER, "
+            "first_seen TEXT, last_seen TEXT, project_path TEXT, file TEXT, commit_sha TEXT, "
+            "author TEXT, match TEXT, seq INTEGER)"
+        )
+        self.conn.execute(
+            "CREATE TABLE secret_projects (key TEXT, project TEXT, PRIMARY KEY (key, project)) WITHOUT ROWID"
+        )
+        self.batch_size = batch_size
+        self.buffer = []
+        self.seq = 0
+
+    def add(self, record):
+        key = record.get("SecretHash") or record.get("Fingerprint")
+        if not key:
+            return
+        self.seq += 1
+        self.buffer.append((
+            key,
+            record.get("RuleID", ""),
+            record.get("Date") or None,
+            record.get("project_path") or record.get("report", ""),
+            record.get("File", ""),
+            record.get("Commit", ""),
+            record.get("Author", ""),
+            record.get("Match", ""),
+            self.seq,
+        ))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.conn.executemany(
+            "INSERT INTO secrets VALUES (?1, ?2, 1, ?3, ?3, ?4, ?5, ?6, ?7, ?8, ?9) "
+            "ON CONFLICT(key) DO UPDATE SET occurrences = occurrences + 1, "
+            "first_seen = coalesce(min(first_seen, excluded.first_seen), first_seen, excluded.first_seen), "
+            "last_seen = coalesce(max(last_seen, excluded.last_seen), last_seen, excluded.last_seen)",
+            self.buffer,
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO secret_projects VALUES (?, ?)",
+            [(row[0], row[3]) for row in self.buffer],
+        )
+        self.buffer = []
+
+    def write_csv(self, output_path):
+        """Write the unique secrets, most widespread first; returns the row count."""
+        self.flush()
+        rows = 0
+        query = (
+            "SELECT s.key, s.rule_id, s.occurrences, "
+            "(SELECT count(*) FROM secret_projects p WHERE p.key = s.key), "
+            "s.first_seen, s.last_seen, s.project_path, s.file, s.commit_sha, s.author, s.match "
+            "FROM secrets s ORDER BY s.occurrences DESC, s.seq"
+        )
+        with Path(output_path).open("w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            writer.writerow(DEDUP_COLUMNS)
+            for row in self.conn.execute(query):
+                writer.writerow(["" if value is None else value for value in row])
+                rows += 1
+        return rows
+
+    def close(self):
+        self.conn.close()
+        os.remove(self.path)
+
+
+def iter_report_paths(reports_dir, pattern):
+    for report_path in sorted(reports_dir.glob(pattern)):
+        if not report_path.is_file():
+            continue
+        if report_path.name.endswith((".schema.json", ".meta.json")):
+            continue
+        yield report_path
+
+
+def describe_error(exc):
+    return f"{type(exc).__name__}: {exc}"
+
+
+def convert_report(report_path, part_path, stream=False, report_key=""):
+    """Worker: write the records of one report to a JSON Lines part file.
+
+    Returns (row_count, error); rows parsed before an error are kept, the
+    same as the serial path which has already written them.
+    """
+    rows = 0
+    error = ""
+    with open(part_path, "w", encoding="utf-8") as part:
+        try:
+            for record in iter_report_records(Path(report_path), report_key, stream):
+                part.write(json.dumps(record, ensure_ascii=False) + "\n")
+                rows += 1
+        except (OSError, ValueError) as e:
+            error = describe_error(e)
+    return rows, error
+
+
+def iter_part_rows(part_path):
+    with open(part_path, "r", encoding="utf-8") as part:
+        for line in part:
+            yield json.loads(line)
+
+
+def convert_reports(tasks, reports_dir, stream=False, jobs=1):
+    """Convert (report_path, part_path) tasks, yielding (report_path, part_path, rows, error) in task order."""
+    report_keys = [report_key_for(report_path, reports_dir) for report_path, _ in tasks]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(
+                convert_report,
+                [str(report_path) for report_path, _ in tasks],
+                [part_path for _, part_path in tasks],
+                itertools.repeat(stream),
+                report_keys,
+            )
+            for (report_path, part_path), (rows, error) in zip(tasks, results):
+                yield report_path, part_path, rows, error
+        return
+
+    for (report_path, part_path), report_key in zip(tasks, report_keys):
+        rows, error = convert_report(str(report_path), part_path, stream, report_key)
+        yield report_path, part_path, rows, error
+
+
+def report_key_for(report_path, reports_dir):
+    return report_path.relative_to(reports_dir).as_posix()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    reports = manifest.get("reports")
+    return reports if isinstance(reports, dict) else {}
+
+
+def save_manifest(manifest_path, reports):
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "reports": reports}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def plan_incremental(report_paths, reports_dir, manifest, parts_dir):
+    """Split reports into unchanged and to-parse, keyed by path, size, mtime and content hash.
+
+    Returns (entries, tasks, removed): manifest entries for every current
+    report, the (report_path, part_path) tasks to parse, and the keys of
+    reports that disappeared since the last run.
+    """
+    entries = {}
+    tasks = []
+    for report_path in report_paths:
+        key = report_key_for(report_path, reports_dir)
+        stat = report_path.stat()
+        part_name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + ".jsonl"
+        part_path = os.path.join(parts_dir, part_name)
+        previous = manifest.get(key)
+        unchanged = False
+        if previous and previous.get("sha256") and os.path.exists(part_path):
+            if previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+                unchanged = True
+            elif previous.get("size") == stat.st_size and previous.get("sha256") == file_sha256(report_path):
+                # touched but identical content: keep the rows, refresh the stat
+                unchanged = True
+
+        if unchanged:
+            entries[key] = dict(previous, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        else:
+            entries[key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": file_sha256(report_path),
+                "part": part_name,
+                "rows": 0,
+            }
+            tasks.append((report_path, part_path))
+
+    removed = [key for key in manifest if key not in entries]
+    return entries, tasks, removed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--reports-dir",
+        default=str(Path.cwd() / "reports"),
+        help="Directory containing gitleaks JSON reports.",
+    )
+    parser.add_argument(
+        "--output",
+        default=str(Path.cwd() / "reports" / "gitleaks_findings.csv"),
+        help="Output CSV path.",
+    )
+    parser.add_argument(
+        "--pattern",
+        default="*.json",
+        help="Glob pattern for report files inside reports-dir.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Parse reports incrementally so memory stays flat for very large reports.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only parse reports that are new or changed since the last run (see --manifest).",
+    )
+    parser.add_argument(
+        "--manifest",
+        default="",
+        help="Manifest of ingested reports for --incremental (default: <output>.manifest.json).",
+    )
+    parser.add_argument(
+        "--sqlite",
+        default="",
+        help="Also write findings (with project, batch, commit, line, fingerprint) to an indexed SQLite database.",
+    )
+    parser.add_argument(
+        "--dedup-output",
+        default="",
+        help="Also write one row per unique secret (RuleID + secret hash, else Fingerprint) "
+             "with occurrence counts and first/last seen dates.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Parse reports in N worker processes; output order is unchanged.",
+    )
+    args = parser.parse_args()
+
+    reports_dir = Path(args.reports_dir)
+    output_path = Path(args.output)
+
+    if not reports_dir.exists() or not reports_dir.is_dir():
+        raise SystemExit(f"reports dir not found: {reports_dir}")
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    columns = ["File", "RuleID", "Author", "Date", "Message", "Entropy", "Match"]
+
+    report_paths = list(iter_report_paths(reports_dir, args.pattern))
+    total_files = len(report_paths)
+    total_rows = 0
+    failures = []
+    incremental_counts = None
+    dedup = DedupIndex(output_path.parent) if args.dedup_output else None
+    dedup_rows = 0
+
+    if args.incremental:
+        # Rows of every report are kept in a per-report part file next to the
+        # output. Only new or changed reports are re-parsed (their part file is
+        # overwritten, so rewritten reports replace their rows), then the CSV
+        # is rebuilt from the parts in report order.
+        manifest_path = Path(args.manifest) if args.manifest else output_path.with_name(output_path.name + ".manifest.json")
+        parts_dir = output_path.with_name(output_path.name + ".parts")
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        manifest = load_manifest(manifest_path)
+        entries, tasks, removed = plan_incremental(report_paths, reports_dir, manifest, parts_dir)
+        db = FindingsDb(args.sqlite, reset=False) if args.sqlite else None
+
+        for report_path, part_path, rows, error in convert_reports(tasks, reports_dir, args.stream, args.jobs):
+            key = report_key_for(report_path, reports_dir)
+            entries[key]["rows"] = rows
+            if error:
+                # keep the partial rows like a full run would, but retry next time
+                entries[key]["sha256"] = ""
+                failures.append((report_path, error))
+            if db and not db.created:
+                db.delete_report(key)
+                for record in iter_part_rows(part_path):
+                    db.add(record)
+
+        for key in removed:
+            part_name = manifest[key].get("part")
+            if part_name and (parts_dir / part_name).exists():
+                (parts_dir / part_name).unlink()
+            if db:
+                db.delete_report(key)
+
+        with output_path.open("w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            sinks = [writer.writerow]
+            if db and db.created:
+                # a new database is loaded from every part, not just the changed ones
+                sinks.append(db.add)
+            if dedup:
+                sinks.append(dedup.add)
+            for report_path in report_paths:
+                entry = entries[report_key_for(report_path, reports_dir)]
+                for record in iter_part_rows(parts_dir / entry["part"]):
+                    for sink in sinks:
+                        sink(record)
+                total_rows += entry["rows"]
+
+        if db:
+            db.close()
+        save_manifest(manifest_path, entries)
+        incremental_counts = (len(tasks), len(removed))
+    else:
+        db = FindingsDb(args.sqlite) if args.sqlite else None
+        with output_path.open("w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            sinks = [writer.writerow]
+            if db:
+                sinks.append(db.add)
+            if dedup:
+                sinks.append(dedup.add)
+
+            if args.jobs > 1:
+                # Workers parse reports into part files; parts are merged strictly
+                # in report order so the CSV matches a single-process run.
+                with tempfile.TemporaryDirectory(prefix=".gitleaks_parts_", dir=output_path.parent) as parts_dir:
+                    tasks = [(p, os.path.join(parts_dir, f"{n}.jsonl")) for n, p in enumerate(report_paths)]
+                    for report_path, part_path, rows, error in convert_reports(tasks, reports_dir, args.stream, args.jobs):
+                        for record in iter_part_rows(part_path):
+                            for sink in sinks:
+                                sink(record)
+                        os.remove(part_path)
+                        total_rows += rows
+                        if error:
+                            failures.append((report_path, error))
+            else:
+                for report_path in report_paths:
+                    report_key = report_key_for(report_path, reports_dir)
+                    try:
+                        for record in iter_report_records(report_path, report_key, args.stream):
+                            for sink in sinks:
+                                sink(record)
+                            total_rows += 1
+                    except (OSError, ValueError) as e:
+                        failures.append((report_path, describe_error(e)))
+        if db:
+            db.close()
+
+    if dedup:
+        dedup_rows = dedup.write_csv(args.dedup_output)
+        dedup.close()
+
+    print(f"[+] scanned json files: {total_files}")
+    print(f"[+] extracted rows: {total_rows}")
+    if incremental_counts:
+        print(f"[+] new or changed json files: {incremental_counts[0]}")
+        print(f"[+] removed json files: {incremental_counts[1]}")
+    if failures:
+        print(f"[!] failed json files: {len(failures)}")
+        for report_path, error in failures[:20]:
+            print(f"    - {report_path}: {error}")
+        if len(failures) > 20:
+            print(f"    ... and {len(failures) - 20} more")
+    print(f"[+] output: {output_path}")
+    if args.sqlite:
+        print(f"[+] sqlite: {args.sqlite}")
+    if dedup:
+        print(f"[+] unique secrets: {dedup_rows}")
+        print(f"[+] dedup output: {args.dedup_output}")
+
+
+if __name__ == "__main__":
+    main()
+